@@ -7,36 +7,240 @@ trade-offs between options rather than declaring winners.
 
 import os
 import json
-import time
-from typing import Dict, List, Optional
-from openai import OpenAI
+import random
+import asyncio
+import orjson
+from functools import lru_cache
+from string import Template
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+import httpx
+from aiolimiter import AsyncLimiter
+from openai import (
+    AsyncOpenAI,
+    APIConnectionError,
+    InternalServerError,
+    RateLimitError,
+)
+from cache import ResponseCache, SemanticCache
 from models import OptionAnalysis, ComparisonResponse
 
+# Errors worth retrying: transient network trouble, 5xx, and rate limits.
+# Anything else (auth failures, bad requests, unknown model) will never
+# succeed on retry and should surface immediately.
+_RETRIABLE_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
+
+# One shared HTTP client for all analyzer instances. A generous keep-alive
+# pool holds TLS connections to api.perplexity.ai open between requests, so
+# only the very first call pays the DNS + TLS handshake cost.
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=100,
+    keepalive_expiry=300
+)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _shared_http_client() -> httpx.AsyncClient:
+    """Return the shared httpx client, creating it on first use."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=_HTTP_LIMITS,
+            http2=True,
+            timeout=60
+        )
+    return _http_client
+
+
+async def aclose_http_client() -> None:
+    """Close the shared HTTP client (call on application shutdown)."""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+
+
+# The prompt skeleton is compiled once at import; per request only the
+# placeholders are substituted.
+_PROMPT_TEMPLATE = Template("""Analyze these options briefly. No winner declarations.
+
+Question: $question
+Options: $options
+Criteria: $criteria$ctx
+
+For each option:
+- 2 key strengths (short phrases)
+- 1-2 weaknesses (short phrases)
+- 1-2 sentence explanation
+
+Be very concise. No citations or references.
+
+JSON only:
+{
+    "options": {$skeleton},
+    "trade_offs": "Key trade-off in 1-2 sentences.",
+    "context_notes": "$notes"
+}""")
+
+
+# Fallbacks used when the LLM omits part of an option's analysis; built once
+# instead of re-formatted on every response.
+_FALLBACK_STRENGTHS = ("Strong capabilities in key areas",)
+_FALLBACK_WEAKNESSES = ("May require additional consideration",)
+
+
+def _fallback_analysis(option: str) -> OptionAnalysis:
+    """Placeholder analysis for an option the LLM skipped entirely."""
+    return OptionAnalysis.model_construct(
+        strengths=list(_FALLBACK_STRENGTHS),
+        weaknesses=list(_FALLBACK_WEAKNESSES),
+        explanation=f"{option} offers a balanced approach with distinct advantages for specific use cases."
+    )
+
+
+class _JsonBoundaryScanner:
+    """
+    Tracks how far a streamed buffer is into a top-level JSON object.
+
+    Feed text incrementally; `complete` flips once the outermost object
+    closes, letting the caller stop consuming the stream early instead of
+    waiting for trailing tokens.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.complete = False
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, text: str) -> None:
+        for char in text:
+            if self._escaped:
+                self._escaped = False
+            elif char == '\\':
+                self._escaped = True
+            elif char == '"':
+                self._in_string = not self._in_string
+            elif not self._in_string:
+                if char == '{':
+                    self.depth += 1
+                    self.started = True
+                elif char == '}':
+                    self.depth -= 1
+                    if self.started and self.depth == 0:
+                        self.complete = True
+                        return
+
+
+@lru_cache(maxsize=256)
+def _options_skeleton(options: Tuple[str, ...]) -> str:
+    """Build the example JSON skeleton covering every option; shapes repeat
+    across requests, so recent skeletons are memoized."""
+    return ", ".join(
+        f'"{option}": {{"strengths": ["Short strength 1", "Short strength 2"], '
+        f'"weaknesses": ["Short weakness"], '
+        f'"explanation": "Brief explanation in 1-2 sentences."}}'
+        for option in options
+    )
+
 
 class LLMAnalyzer:
     """
     LLM-powered analyzer for generating trade-off explanations.
-    
+
     Uses Perplexity API to analyze options and provide detailed
     trade-off analysis without declaring winners.
     """
-    
+
+    # Immutable system message shared by every request; the OpenAI client
+    # copies it into a plain dict during request transform
+    _SYSTEM_MSG = MappingProxyType({
+        "role": "system",
+        "content": "You are an expert decision analyst who helps people understand trade-offs without declaring winners."
+    })
+
+    __slots__ = (
+        "client", "model", "max_retries", "retry_delay", "temperature",
+        "cache", "semantic_cache", "upstream", "_semaphore",
+        "_request_bucket", "_token_bucket"
+    )
+
     def __init__(self, api_key: Optional[str] = None):
         """Initialize the LLM analyzer with Perplexity client."""
         api_key = api_key or os.getenv("PERPLEXITY_API_KEY")
         if not api_key:
             raise ValueError("Perplexity API key is required. Set PERPLEXITY_API_KEY environment variable or pass api_key parameter.")
-        
+
         # Perplexity uses OpenAI-compatible API
-        self.client = OpenAI(
+        self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url="https://api.perplexity.ai"
+            base_url="https://api.perplexity.ai",
+            http_client=_shared_http_client()
         )
         self.model = "sonar"  # Updated to current Perplexity model name
         self.max_retries = 3
         self.retry_delay = 1.0
-    
-    def analyze_options(
+        # Cap concurrent Perplexity calls so bursts don't blow through RPM limits
+        max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "10"))
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Global token buckets: requests/minute always, tokens/minute when a
+        # TPM budget is configured. These pace concurrent requests instead of
+        # letting each one independently run into 429s.
+        rpm = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "60"))
+        self._request_bucket = AsyncLimiter(rpm, 60)
+        tpm = int(os.getenv("MAX_TOKENS_PER_MINUTE", "0"))
+        self._token_bucket = AsyncLimiter(tpm, 60) if tpm > 0 else None
+        # Real upstream state, filled in by probe() at startup
+        self.upstream = {"status": "unknown"}
+        self.temperature = 0.7
+        self.cache = ResponseCache()
+        self.semantic_cache = SemanticCache(
+            threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        )
+
+    async def probe(self) -> None:
+        """
+        Open a connection to Perplexity with a 1-token request.
+
+        Run once at startup: the first real comparison then skips the cold
+        TLS handshake, and any x-ratelimit-* headers on the reply retune
+        the request/token buckets to the account's actual limits. The
+        observed upstream state is kept for /health.
+        """
+        try:
+            raw = await self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=[{"role": "user", "content": "ok"}],
+                max_tokens=1
+            )
+        except Exception as e:
+            self.upstream = {"status": f"unreachable: {e}"}
+            raise
+
+        self.upstream = {"status": "ok"}
+        rpm = self._header_int(raw.headers, "x-ratelimit-limit-requests")
+        if rpm:
+            self._request_bucket = AsyncLimiter(rpm, 60)
+            self.upstream["requests_per_minute"] = rpm
+        tpm = self._header_int(raw.headers, "x-ratelimit-limit-tokens")
+        if tpm:
+            self._token_bucket = AsyncLimiter(tpm, 60)
+            self.upstream["tokens_per_minute"] = tpm
+
+    @staticmethod
+    def _header_int(headers, name: str) -> Optional[int]:
+        """Parse an integer header value, or None if absent/garbled."""
+        value = headers.get(name)
+        if not value:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    async def analyze_options(
         self, 
         question: str, 
         options: List[str], 
@@ -55,122 +259,162 @@ class LLMAnalyzer:
         Returns:
             ComparisonResponse with detailed trade-off analysis
         """
+        # Identical requests get the stored analysis back without an API call.
+        # The model and sampling settings are part of the key so cached
+        # entries are invalidated if either changes.
+        cache_key = ResponseCache.make_key({
+            "q": question,
+            "o": sorted(options),
+            "c": sorted(criteria),
+            "ctx": context,
+            "model": self.model,
+            "temperature": self.temperature
+        })
+        # The semantic bucket pins everything except the question wording, so
+        # a paraphrase can only match an analysis of the same options.
+        semantic_bucket = ResponseCache.make_key({
+            "o": sorted(options),
+            "c": sorted(criteria),
+            "ctx": context,
+            "model": self.model,
+            "temperature": self.temperature
+        })
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            cached = self.semantic_cache.get(semantic_bucket, question)
+        if cached is not None:
+            return ComparisonResponse(**cached)
+
         prompt = self._build_analysis_prompt(question, options, criteria, context)
-        
+
         # Get LLM response with retry logic
-        response_text = self._get_llm_response(prompt)
-        
-        # Parse the response
-        analysis_data = self._parse_llm_response(response_text)
-        
+        response_text = await self._get_llm_response(prompt)
+
+        # Parse the response; if the model still produced invalid JSON,
+        # re-ask once deterministically instead of returning stub data
+        try:
+            analysis_data = self._parse_llm_response(response_text)
+        except ValueError:
+            response_text = await self._get_llm_response(prompt, temperature=0.0)
+            analysis_data = self._parse_llm_response(response_text)
+
         # Build the response
-        return self._build_comparison_response(
+        response = self._build_comparison_response(
             question, options, analysis_data, context
         )
+        dumped = response.model_dump()
+        self.cache.set(cache_key, dumped)
+        self.semantic_cache.set(semantic_bucket, question, dumped)
+        return response
     
     def _build_analysis_prompt(
-        self, 
-        question: str, 
-        options: List[str], 
-        criteria: List[str], 
+        self,
+        question: str,
+        options: List[str],
+        criteria: List[str],
         context: Optional[str] = None
     ) -> str:
-        """Build the analysis prompt for the LLM."""
-        
-        context_section = f"\nContext: {context}" if context else ""
-        
-        prompt = f"""Analyze these options briefly. No winner declarations.
-
-Question: {question}
-Options: {', '.join(options)}
-Criteria: {', '.join(criteria)}{context_section}
-
-For each option:
-- 2 key strengths (short phrases)
-- 1-2 weaknesses (short phrases)
-- 1-2 sentence explanation
-
-Be very concise. No citations or references.
-
-JSON only:
-{{
-    "options": {{
-        "{options[0]}": {{
-            "strengths": ["Short strength 1", "Short strength 2"],
-            "weaknesses": ["Short weakness"],
-            "explanation": "Brief explanation in 1-2 sentences."
-        }}{f', "{options[1]}": {{"strengths": ["Short strength 1", "Short strength 2"], "weaknesses": ["Short weakness"], "explanation": "Brief explanation."}}' if len(options) > 1 else ''}
-    }},
-    "trade_offs": "Key trade-off in 1-2 sentences.",
-    "context_notes": "{f'Brief context note.' if context else 'null'}"
-}}"""
-
-        return prompt
+        """Build the analysis prompt by filling in the precompiled template."""
+        return _PROMPT_TEMPLATE.substitute(
+            question=question,
+            options=", ".join(options),
+            criteria=", ".join(criteria),
+            ctx=f"\nContext: {context}" if context else "",
+            skeleton=_options_skeleton(tuple(options)),
+            notes="Brief context note." if context else "null"
+        )
     
-    def _get_llm_response(self, prompt: str) -> str:
+    async def _get_llm_response(
+        self, prompt: str, temperature: Optional[float] = None
+    ) -> str:
         """Get response from LLM with retry logic."""
-        
+
         for attempt in range(self.max_retries):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are an expert decision analyst who helps people understand trade-offs without declaring winners."
-                        },
-                        {
-                            "role": "user", 
-                            "content": prompt
-                        }
-                    ],
-                    temperature=0.7,
-                    max_tokens=2000
-                )
-                
-                return response.choices[0].message.content
-                
-            except Exception as e:
+                async with self._semaphore, self._request_bucket:
+                    if self._token_bucket is not None:
+                        # Rough budget: ~4 chars/token of prompt plus the
+                        # response allowance, clamped to bucket capacity.
+                        estimated = min(
+                            len(prompt) // 4 + 2000,
+                            int(self._token_bucket.max_rate)
+                        )
+                        await self._token_bucket.acquire(estimated)
+                    stream = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            self._SYSTEM_MSG,
+                            {"role": "user", "content": prompt}
+                        ],
+                        temperature=self.temperature if temperature is None else temperature,
+                        max_tokens=2000,
+                        response_format={"type": "json_object"},
+                        stream=True
+                    )
+
+                    parts = []
+                    scanner = _JsonBoundaryScanner()
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        parts.append(delta)
+                        scanner.feed(delta)
+                        if scanner.complete:
+                            # The JSON object is closed; anything after it
+                            # is trailing prose we would discard anyway
+                            await stream.response.aclose()
+                            break
+
+                return "".join(parts)
+
+            except _RETRIABLE_ERRORS as e:
                 if attempt == self.max_retries - 1:
                     raise Exception(f"LLM analysis failed after {self.max_retries} attempts: {str(e)}")
-                
-                # Exponential backoff
-                time.sleep(self.retry_delay * (2 ** attempt))
-        
+
+                # Honor an explicit Retry-After; otherwise full-jitter
+                # exponential backoff so retries don't arrive in lockstep
+                delay = self._retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, self.retry_delay * (2 ** attempt))
+                await asyncio.sleep(delay)
+
         raise Exception("Unexpected error in LLM response")
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Extract a Retry-After delay in seconds from a 429, if present."""
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is None:
+            return None
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
     
     def _parse_llm_response(self, response_text: str) -> Dict:
-        """Parse the LLM response JSON with improved error handling."""
+        """Parse the LLM response JSON.
+
+        JSON mode guarantees a bare object in the common case; the
+        boundary scan only trims stray prose or Markdown fences. Raises
+        ValueError on malformed JSON so the caller can re-ask the model.
+        """
+        # Trim to the outermost JSON object
+        start_idx = response_text.find('{')
+        end_idx = response_text.rfind('}') + 1
+
+        if start_idx == -1 or end_idx == 0:
+            raise ValueError("No JSON found in response")
+
         try:
-            # Try to extract JSON from the response
-            start_idx = response_text.find('{')
-            end_idx = response_text.rfind('}') + 1
-            
-            if start_idx == -1 or end_idx == 0:
-                raise ValueError("No JSON found in response")
-            
-            json_text = response_text[start_idx:end_idx]
-            
-            # Clean up common JSON issues
-            json_text = json_text.replace('\n', ' ')  # Remove newlines
-            json_text = json_text.replace('\\', '\\\\')  # Escape backslashes
-            
-            return json.loads(json_text)
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            # If JSON parsing fails, create a fallback response
-            print(f"JSON parsing failed: {e}")
-            print(f"Response text: {response_text[:500]}...")
-            
-            # Return a simple fallback structure
-            return {
-                "options": {},
-                "trade_offs": "Analysis parsing failed. Please try again.",
-                "context_notes": None
-            }
-            
-        except Exception as e:
-            raise Exception(f"Failed to parse LLM response: {str(e)}")
+            return orjson.loads(response_text[start_idx:end_idx])
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in response: {e}")
     
     def _build_comparison_response(
         self, 
@@ -184,22 +428,27 @@ JSON only:
         # Build analysis for each option
         analysis = {}
         options_data = analysis_data.get("options", {})
-        
+
         for option in options:
-            option_data = options_data.get(option, {})
-            
-            # Provide fallback data if LLM didn't provide complete analysis
-            strengths = option_data.get("strengths", [f"Strong capabilities in key areas"])
-            weaknesses = option_data.get("weaknesses", ["May require additional consideration"])
-            explanation = option_data.get("explanation", f"{option} offers a balanced approach with distinct advantages for specific use cases.")
-            
-            # Ensure we have valid lists
-            if not isinstance(strengths, list) or not strengths:
-                strengths = [f"Strong capabilities in key areas"]
-            if not isinstance(weaknesses, list) or not weaknesses:
-                weaknesses = ["May require additional consideration"]
-            
-            analysis[option] = OptionAnalysis(
+            option_data = options_data.get(option)
+            if option_data is None:
+                analysis[option] = _fallback_analysis(option)
+                continue
+
+            # Fill in fallbacks only where the LLM left gaps; `or` skips the
+            # isinstance check in the common complete case
+            strengths = option_data.get("strengths") or list(_FALLBACK_STRENGTHS)
+            weaknesses = option_data.get("weaknesses") or list(_FALLBACK_WEAKNESSES)
+            explanation = option_data.get("explanation") or (
+                f"{option} offers a balanced approach with distinct advantages for specific use cases."
+            )
+            if not isinstance(strengths, list):
+                strengths = list(_FALLBACK_STRENGTHS)
+            if not isinstance(weaknesses, list):
+                weaknesses = list(_FALLBACK_WEAKNESSES)
+
+            # Data came from our own parser, so skip Pydantic revalidation
+            analysis[option] = OptionAnalysis.model_construct(
                 strengths=strengths,
                 weaknesses=weaknesses,
                 explanation=explanation
@@ -213,7 +462,9 @@ JSON only:
         if context_notes == "null" or context_notes == "None":
             context_notes = None
         
-        return ComparisonResponse(
+        # The whole payload was assembled here from trusted parser output,
+        # so skip Pydantic revalidation on the way out
+        return ComparisonResponse.model_construct(
             question=question,
             analysis=analysis,
             trade_offs=trade_offs,
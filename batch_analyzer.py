@@ -0,0 +1,166 @@
+"""
+Micro-batching wrapper for the LLM analyzer.
+
+Coalesces concurrent analyze_options calls into a single Perplexity
+request whose prompt carries all pending sub-questions, amortizing the
+network round-trip and system-prompt tokens across the batch. When only
+one request is waiting it delegates straight to the wrapped analyzer so
+low-traffic latency is unaffected.
+"""
+
+import json
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+from analyzer import LLMAnalyzer
+from models import ComparisonResponse
+
+
+class BatchingLLMAnalyzer:
+    """
+    Queues analyze_options calls and drains them in small batches.
+
+    Calls arriving within the batch window (default 25 ms) are merged
+    into one LLM request that asks for a JSON array of results, one per
+    sub-question. Each caller's future is resolved with its own
+    ComparisonResponse. If the batched response cannot be parsed, the
+    batch falls back to individual calls.
+    """
+
+    def __init__(
+        self,
+        analyzer: Optional[LLMAnalyzer] = None,
+        max_batch: int = 8,
+        batch_window: float = 0.025
+    ):
+        self.analyzer = analyzer or LLMAnalyzer()
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._queue: "asyncio.Queue[Tuple[tuple, asyncio.Future]]" = asyncio.Queue()
+        self._drain_task: Optional[asyncio.Task] = None
+
+    async def probe(self) -> None:
+        """Warm the wrapped analyzer's connection and read its rate limits."""
+        await self.analyzer.probe()
+
+    @property
+    def upstream(self):
+        return self.analyzer.upstream
+
+    async def analyze_options(
+        self,
+        question: str,
+        options: List[str],
+        criteria: List[str],
+        context: Optional[str] = None
+    ) -> ComparisonResponse:
+        """Enqueue a request and wait for its result from the batch drain."""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((question, options, criteria, context), future))
+        if self._drain_task is None or self._drain_task.done():
+            self._drain_task = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        """Drain the queue in batches until it is empty."""
+        while not self._queue.empty():
+            batch = [await self._queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            if len(batch) == 1:
+                await self._run_single(*batch[0])
+            else:
+                await self._run_batch(batch)
+
+    async def _run_single(self, args: tuple, future: asyncio.Future) -> None:
+        """Delegate a lone request directly to the wrapped analyzer."""
+        try:
+            result = await self.analyzer.analyze_options(*args)
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    async def _run_batch(self, batch: List[Tuple[tuple, asyncio.Future]]) -> None:
+        """Resolve a batch of requests through one combined LLM call."""
+        try:
+            prompt = self._build_batch_prompt([args for args, _ in batch])
+            response_text = await self.analyzer._get_llm_response(prompt)
+            results = self._parse_batch_response(response_text, len(batch))
+        except Exception:
+            results = None
+
+        if results is None:
+            # Combined call failed or came back malformed; fall back to
+            # individual requests so no caller is stuck with stub data.
+            await asyncio.gather(
+                *(self._run_single(args, future) for args, future in batch)
+            )
+            return
+
+        for (args, future), item in zip(batch, results):
+            question, options, _, context = args
+            response = self.analyzer._build_comparison_response(
+                question, options, item, context
+            )
+            if not future.done():
+                future.set_result(response)
+
+    def _build_batch_prompt(self, requests: List[tuple]) -> str:
+        """Build one prompt covering all queued decisions."""
+        sections = []
+        for i, (question, options, criteria, context) in enumerate(requests):
+            context_section = f"\nContext: {context}" if context else ""
+            sections.append(
+                f"Decision {i}:\n"
+                f"Question: {question}\n"
+                f"Options: {', '.join(options)}\n"
+                f"Criteria: {', '.join(criteria)}{context_section}"
+            )
+
+        return f"""Analyze the following {len(requests)} independent decisions. No winner declarations.
+
+{chr(10).join(sections)}
+
+For each option in each decision:
+- 2 key strengths (short phrases)
+- 1-2 weaknesses (short phrases)
+- 1-2 sentence explanation
+
+Be very concise. No citations or references.
+
+Return ONLY a JSON array indexed 0..{len(requests) - 1}, one object per decision:
+[
+    {{
+        "options": {{"<option name>": {{"strengths": [...], "weaknesses": [...], "explanation": "..."}}}},
+        "trade_offs": "Key trade-off in 1-2 sentences.",
+        "context_notes": "Brief context note or null."
+    }}
+]"""
+
+    def _parse_batch_response(
+        self, response_text: str, expected: int
+    ) -> Optional[List[Dict]]:
+        """Extract the JSON array of per-decision results, or None if malformed."""
+        start_idx = response_text.find('[')
+        end_idx = response_text.rfind(']') + 1
+        if start_idx == -1 or end_idx == 0:
+            return None
+
+        try:
+            results = json.loads(response_text[start_idx:end_idx])
+        except json.JSONDecodeError:
+            return None
+
+        if not isinstance(results, list) or len(results) != expected:
+            return None
+        return results
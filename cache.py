@@ -0,0 +1,181 @@
+"""
+Response cache for LLM analysis results.
+
+Caches completed analyses keyed by a hash of the normalized request so
+repeat /compare calls skip the Perplexity round-trip entirely. A small
+in-memory LRU sits in front of an SQLite table, which persists results
+across process restarts.
+"""
+
+import re
+import json
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    Two-level cache: in-process LRU dict backed by an on-disk SQLite table.
+
+    Values are JSON-serializable dicts (e.g. ComparisonResponse.model_dump()).
+    Entries expire after `ttl` seconds. Hit/miss counters are exposed for
+    the /health endpoint.
+    """
+
+    def __init__(
+        self,
+        path: str = ".cache/llm.db",
+        max_memory_entries: int = 1024,
+        ttl: int = 86400
+    ):
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    @staticmethod
+    def make_key(payload: Dict) -> str:
+        """Build a deterministic cache key from a normalized request payload."""
+        encoded = json.dumps(payload, sort_keys=True).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the cached value for key, or None on miss/expiry."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._memory[key]
+
+            row = self._db.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict) -> None:
+        """Store a value under key with the configured TTL."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, value: Dict, expires_at: float) -> None:
+        """Insert into the in-memory LRU, evicting the oldest entry if full."""
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for health reporting."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+class SemanticCache:
+    """
+    Approximate cache that matches paraphrased questions.
+
+    Questions are embedded with a hashing-trick bag-of-words vector and
+    compared by cosine similarity; a lookup hits when similarity exceeds
+    the threshold. Entries are scoped to a bucket (the hash of options,
+    criteria, context and model) so a paraphrase can only ever match a
+    response that analyzed the exact same options — only the question
+    wording is allowed to vary.
+    """
+
+    def __init__(
+        self,
+        dim: int = 256,
+        threshold: float = 0.92,
+        max_entries: int = 10_000
+    ):
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[float], Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _embed(self, text: str) -> List[float]:
+        """Embed text as a unit-normalized hashed bag-of-words vector."""
+        vector = [0.0] * self.dim
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=4).digest()
+            vector[int.from_bytes(digest, "big") % self.dim] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        if norm > 0:
+            vector = [v / norm for v in vector]
+        return vector
+
+    def get(self, bucket: str, question: str) -> Optional[Dict]:
+        """Return the closest cached value above the similarity threshold."""
+        query = self._embed(question)
+        with self._lock:
+            best_key = None
+            best_similarity = 0.0
+            for key, (vector, _) in self._entries.items():
+                if key[0] != bucket:
+                    continue
+                similarity = sum(a * b for a, b in zip(vector, query))
+                if similarity > best_similarity:
+                    best_similarity = similarity
+                    best_key = key
+
+            if best_key is not None and best_similarity > self.threshold:
+                self._entries.move_to_end(best_key)
+                self.hits += 1
+                return self._entries[best_key][1]
+
+            self.misses += 1
+            return None
+
+    def set(self, bucket: str, question: str, value: Dict) -> None:
+        """Index a value under its bucket and question embedding."""
+        with self._lock:
+            key = (bucket, question.lower().strip())
+            self._entries[key] = (self._embed(question), value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for health reporting."""
+        return {"hits": self.hits, "misses": self.misses}
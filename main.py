@@ -7,16 +7,23 @@ explanations for decision-making without declaring winners.
 
 import os
 import json
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+import asyncio
+import inspect
+from typing import List
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import ValidationError
 from dotenv import load_dotenv
-from models import ComparisonRequest, ComparisonResponse
-from analyzer import LLMAnalyzer
+import orjson
+import msgspec
+from fastapi.responses import Response
+from models import ComparisonRequest, ComparisonRequestStruct, ComparisonResponse
+from analyzer import LLMAnalyzer, aclose_http_client
+from batch_analyzer import BatchingLLMAnalyzer
 from mock_analyzer import MockAnalyzer
 
 # Load environment variables
@@ -28,7 +35,8 @@ app = FastAPI(
     description="LLM-powered comparison API that explains trade-offs without declaring winners",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse
 )
 
 # Mount static files
@@ -57,6 +65,9 @@ if USE_MOCK_MODE:
 else:
     try:
         analyzer = LLMAnalyzer()
+        # Opt-in micro-batching: coalesce concurrent requests into one call
+        if os.getenv("LLM_BATCHING", "").lower() in ("1", "true", "yes"):
+            analyzer = BatchingLLMAnalyzer(analyzer)
         analyzer_type = "llm"
         print("✓ Using Perplexity LLM analyzer")
     except ValueError as e:
@@ -70,15 +81,48 @@ else:
         analyzer_type = "mock"
         print("✓ Using mock analyzer (Perplexity error)")
 
+def get_analyzer():
+    """Expose the module-level analyzer as a FastAPI dependency.
+
+    Reads the global at call time, so tests can either patch
+    ``main.analyzer`` or override this dependency without rebuilding
+    the app.
+    """
+    return analyzer
+
+
+@app.on_event("startup")
+async def warm_llm_connection():
+    """Pre-open the Perplexity connection and read the account rate limits."""
+    if analyzer_type == "llm":
+        try:
+            await analyzer.probe()
+        except Exception as e:
+            print(f"Warning: LLM warm-up probe failed: {e}")
+
+
+@app.on_event("shutdown")
+async def close_llm_connection():
+    """Close the shared HTTP client cleanly."""
+    await aclose_http_client()
+
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
     """Health check endpoint to verify API is running"""
-    return {
-        "status": "healthy", 
+    health = {
+        "status": "healthy",
         "service": "comparison-tool-api",
         "analyzer": analyzer_type
     }
+    if hasattr(analyzer, "cache"):
+        health["cache"] = analyzer.cache.stats
+    if hasattr(analyzer, "semantic_cache"):
+        health["semantic_cache"] = analyzer.semantic_cache.stats
+    if hasattr(analyzer, "upstream"):
+        health["upstream"] = analyzer.upstream
+    return health
 
 # Root endpoint - serve the UI
 @app.get("/")
@@ -86,15 +130,52 @@ async def root():
     """Serve the comparison tool UI"""
     return FileResponse('static/index.html')
 
-# Main comparison endpoint
-@app.post("/compare", response_model=ComparisonResponse)
-async def compare(request: ComparisonRequest):
+# Main comparison endpoint. The body is decoded with msgspec instead of the
+# regular Pydantic parameter, so the documented schema is attached manually.
+@app.post(
+    "/compare",
+    response_model=ComparisonResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": ComparisonRequest.model_json_schema()
+                }
+            }
+        }
+    }
+)
+async def compare(raw_request: Request, analyzer=Depends(get_analyzer)):
     """
     Compare options and provide trade-off analysis.
-    
+
     Analyzes the provided options against the given criteria and returns
     detailed trade-off explanations without declaring a single winner.
     """
+    try:
+        request = msgspec.json.decode(
+            await raw_request.body(), type=ComparisonRequestStruct
+        )
+    except msgspec.ValidationError as e:
+        return ORJSONResponse(
+            status_code=422,
+            content={
+                "error": "Validation failed",
+                "message": "Request contains invalid data",
+                "details": [str(e)]
+            }
+        )
+    except msgspec.DecodeError as e:
+        return ORJSONResponse(
+            status_code=400,
+            content={
+                "error": "Invalid JSON",
+                "message": "Request body contains malformed JSON",
+                "details": str(e)
+            }
+        )
+
     if analyzer is None:
         raise HTTPException(
             status_code=500,
@@ -102,14 +183,26 @@ async def compare(request: ComparisonRequest):
         )
     
     try:
-        # Perform analysis (LLM or mock)
-        result = analyzer.analyze_options(
-            question=request.question,
-            options=request.options,
-            criteria=request.criteria,
-            context=request.context
-        )
-        
+        # Perform analysis; the LLM analyzer is async, while sync analyzers
+        # (the mock, or any drop-in) run in the threadpool so a slow one
+        # can never block the event loop
+        analyze = analyzer.analyze_options
+        if inspect.iscoroutinefunction(analyze):
+            result = await analyze(
+                question=request.question,
+                options=request.options,
+                criteria=request.criteria,
+                context=request.context
+            )
+        else:
+            result = await asyncio.to_thread(
+                analyze,
+                question=request.question,
+                options=request.options,
+                criteria=request.criteria,
+                context=request.context
+            )
+
         return result
         
     except Exception as e:
@@ -145,17 +238,52 @@ async def compare(request: ComparisonRequest):
                 detail=f"Analysis error: {str(e)}"
             )
 
-# Custom exception handler for validation errors
-@app.exception_handler(RequestValidationError)
-async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    """Handle Pydantic validation errors with detailed messages"""
+# Batch comparison endpoint
+@app.post("/compare_batch")
+async def compare_batch(
+    requests: List[ComparisonRequest], analyzer=Depends(get_analyzer)
+):
+    """
+    Compare several independent decisions in one call.
+
+    Items run concurrently through the analyzer (which bounds upstream
+    concurrency itself) and results are returned in input order. A
+    failing item produces an error entry instead of failing the batch.
+    """
+    if analyzer is None:
+        raise HTTPException(
+            status_code=500,
+            detail="No analyzer available. Please check configuration."
+        )
+
+    async def run_one(item: ComparisonRequest):
+        analyze = analyzer.analyze_options
+        if inspect.iscoroutinefunction(analyze):
+            return await analyze(**item.model_dump())
+        return await asyncio.to_thread(analyze, **item.model_dump())
+
+    results = await asyncio.gather(
+        *(run_one(item) for item in requests), return_exceptions=True
+    )
+    return [
+        {"error": "Analysis failed", "message": str(result)}
+        if isinstance(result, Exception) else result
+        for result in results
+    ]
+
+
+# Error responses: one dispatcher resolves the handler with a dict lookup on
+# the exception type instead of five separately registered closures.
+
+def _validation_error_response(request: Request, exc: RequestValidationError):
+    """Request validation errors with per-field detail messages"""
     errors = []
     for error in exc.errors():
         field = " -> ".join(str(x) for x in error["loc"])
         message = error["msg"]
         errors.append(f"{field}: {message}")
-    
-    return JSONResponse(
+
+    return ORJSONResponse(
         status_code=422,
         content={
             "error": "Validation failed",
@@ -164,11 +292,10 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
-# Custom exception handler for JSON decode errors
-@app.exception_handler(json.JSONDecodeError)
-async def json_decode_exception_handler(request: Request, exc: json.JSONDecodeError):
-    """Handle JSON decode errors"""
-    return JSONResponse(
+
+def _json_decode_error_response(request: Request, exc: json.JSONDecodeError):
+    """Malformed JSON in the request body"""
+    return ORJSONResponse(
         status_code=400,
         content={
             "error": "Invalid JSON",
@@ -177,11 +304,10 @@ async def json_decode_exception_handler(request: Request, exc: json.JSONDecodeEr
         }
     )
 
-# Custom exception handler for general validation errors
-@app.exception_handler(ValidationError)
-async def pydantic_validation_exception_handler(request: Request, exc: ValidationError):
-    """Handle Pydantic validation errors"""
-    return JSONResponse(
+
+def _pydantic_error_response(request: Request, exc: ValidationError):
+    """Pydantic validation errors outside request parsing"""
+    return ORJSONResponse(
         status_code=422,
         content={
             "error": "Data validation failed",
@@ -190,11 +316,10 @@ async def pydantic_validation_exception_handler(request: Request, exc: Validatio
         }
     )
 
-# Custom exception handler for HTTP exceptions
-@app.exception_handler(HTTPException)
-async def http_exception_handler(request: Request, exc: HTTPException):
-    """Handle HTTP exceptions with consistent format"""
-    return JSONResponse(
+
+def _http_exception_response(request: Request, exc: HTTPException):
+    """HTTP exceptions in a consistent envelope"""
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={
             "error": f"HTTP {exc.status_code}",
@@ -202,18 +327,49 @@ async def http_exception_handler(request: Request, exc: HTTPException):
         }
     )
 
-# Global exception handler for unexpected errors
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    """Handle unexpected errors safely"""
-    return JSONResponse(
+
+# The fallback envelope never varies, so it is serialized once at import
+_500_ENVELOPE = orjson.dumps({
+    "error": "Internal server error",
+    "message": "An unexpected error occurred. Please try again later."
+})
+
+
+def _unhandled_error_response(request: Request, exc: Exception):
+    """Unexpected errors, answered from a preserialized body"""
+    return Response(
+        content=_500_ENVELOPE,
         status_code=500,
-        content={
-            "error": "Internal server error",
-            "message": "An unexpected error occurred. Please try again later."
-        }
+        media_type="application/json"
     )
 
+
+_HANDLER_MAP = {
+    RequestValidationError: _validation_error_response,
+    json.JSONDecodeError: _json_decode_error_response,
+    ValidationError: _pydantic_error_response,
+    HTTPException: _http_exception_response,
+}
+
+
+async def _dispatch_exception(request: Request, exc: Exception):
+    """Route an exception to its handler via a single type lookup."""
+    handler = _HANDLER_MAP.get(type(exc))
+    if handler is None:
+        # Subclasses (e.g. orjson.JSONDecodeError) miss the exact-type
+        # lookup; fall back to an isinstance scan
+        for exc_type, candidate in _HANDLER_MAP.items():
+            if isinstance(exc, exc_type):
+                handler = candidate
+                break
+        else:
+            handler = _unhandled_error_response
+    return handler(request, exc)
+
+
+for _exc_type in (*_HANDLER_MAP, Exception):
+    app.add_exception_handler(_exc_type, _dispatch_exception)
+
 if __name__ == "__main__":
     import uvicorn
     
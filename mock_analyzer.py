@@ -2,54 +2,77 @@
 Mock analyzer for testing when OpenAI API is not available.
 """
 
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
 from models import OptionAnalysis, ComparisonResponse
 
 
+@lru_cache(maxsize=1024)
+def _build_mock_analysis(
+    options: Tuple[str, ...],
+    criteria: Tuple[str, ...],
+    context: Optional[str]
+) -> Tuple[Dict[str, OptionAnalysis], str, Optional[str]]:
+    """
+    Build the canned analysis for one (options, criteria, context) shape.
+
+    The same shapes repeat constantly in tests and dev, so the formatted
+    strings and models are memoized; only the question varies per call.
+    Models are built with model_construct since this is canned data, not
+    user input.
+    """
+    analysis = {}
+    for option in options:
+        analysis[option] = OptionAnalysis.model_construct(
+            strengths=[
+                f"Strong performance in {criteria[0] if criteria else 'key areas'}",
+                f"Good {criteria[1] if len(criteria) > 1 else 'value proposition'}",
+                f"Reliable {criteria[2] if len(criteria) > 2 else 'solution'}"
+            ],
+            weaknesses=[
+                f"Higher {criteria[-1] if criteria else 'cost'} compared to alternatives",
+                f"Learning curve for {criteria[0] if criteria else 'implementation'}"
+            ],
+            explanation=f"{option} offers a balanced approach with strong capabilities in {criteria[0] if criteria else 'core functionality'}. While it may require more investment in {criteria[-1] if criteria else 'setup'}, it provides solid long-term value for your use case."
+        )
+
+    trade_offs = f"When choosing between {', '.join(options)}, consider your priorities around {', '.join(criteria[:2]) if len(criteria) >= 2 else 'key factors'}. Each option has distinct advantages that align with different use cases and constraints."
+
+    context_notes = None
+    if context:
+        context_notes = f"Given your context ({context}), focus on solutions that balance immediate needs with long-term scalability."
+
+    return analysis, trade_offs, context_notes
+
+
 class MockAnalyzer:
     """
     Mock analyzer that provides sample responses without calling OpenAI.
     Useful for testing and development when API quota is exceeded.
     """
-    
+
     def analyze_options(
-        self, 
-        question: str, 
-        options: List[str], 
-        criteria: List[str], 
+        self,
+        question: str,
+        options: List[str],
+        criteria: List[str],
         context: Optional[str] = None
     ) -> ComparisonResponse:
         """
         Generate mock trade-off analysis.
         """
-        
-        # Generate mock analysis for each option
-        analysis = {}
-        for i, option in enumerate(options):
-            analysis[option] = OptionAnalysis(
-                strengths=[
-                    f"Strong performance in {criteria[0] if criteria else 'key areas'}",
-                    f"Good {criteria[1] if len(criteria) > 1 else 'value proposition'}",
-                    f"Reliable {criteria[2] if len(criteria) > 2 else 'solution'}"
-                ],
-                weaknesses=[
-                    f"Higher {criteria[-1] if criteria else 'cost'} compared to alternatives",
-                    f"Learning curve for {criteria[0] if criteria else 'implementation'}"
-                ],
-                explanation=f"{option} offers a balanced approach with strong capabilities in {criteria[0] if criteria else 'core functionality'}. While it may require more investment in {criteria[-1] if criteria else 'setup'}, it provides solid long-term value for your use case."
-            )
-        
-        # Generate mock trade-offs
-        trade_offs = f"When choosing between {', '.join(options)}, consider your priorities around {', '.join(criteria[:2]) if len(criteria) >= 2 else 'key factors'}. Each option has distinct advantages that align with different use cases and constraints."
-        
-        # Add context notes if context provided
-        context_notes = None
-        if context:
-            context_notes = f"Given your context ({context}), focus on solutions that balance immediate needs with long-term scalability."
-        
-        return ComparisonResponse(
+        analysis, trade_offs, context_notes = _build_mock_analysis(
+            tuple(options), tuple(criteria), context
+        )
+
+        # Deep-copy the cached models so callers can't mutate shared state
+        return ComparisonResponse.model_construct(
             question=question,
-            analysis=analysis,
+            analysis={
+                option: item.model_copy(deep=True)
+                for option, item in analysis.items()
+            },
             trade_offs=trade_offs,
             context_notes=context_notes
-        )
\ No newline at end of file
+        )
@@ -6,7 +6,41 @@ focusing on trade-off analysis without declaring winners.
 """
 
 from typing import Dict, List, Optional
-from pydantic import BaseModel, Field, validator
+import msgspec
+from pydantic import BaseModel, Field, field_validator
+
+
+def _clean_unique_list(values: List[str], label: str, minimum: int, minimum_message: str) -> List[str]:
+    """Strip entries, rejecting empties and case-insensitive duplicates.
+
+    One pass over the list; shared by the Pydantic validators and the
+    msgspec struct below.
+    """
+    if len(values) < minimum:
+        raise ValueError(minimum_message)
+    seen = set()
+    cleaned = []
+    for value in values:
+        stripped = value.strip() if value else ""
+        if not stripped:
+            raise ValueError(f'{label} cannot be empty')
+        key = stripped.lower()
+        if key in seen:
+            raise ValueError(f'{label} must be unique')
+        seen.add(key)
+        cleaned.append(stripped)
+    return cleaned
+
+
+def _clean_non_empty_list(values: List[str], label: str) -> List[str]:
+    """Strip entries, rejecting empty items, in a single pass."""
+    cleaned = []
+    for value in values:
+        stripped = value.strip() if value else ""
+        if not stripped:
+            raise ValueError(f'Individual {label} cannot be empty')
+        cleaned.append(stripped)
+    return cleaned
 
 
 class ComparisonRequest(BaseModel):
@@ -23,13 +57,13 @@ class ComparisonRequest(BaseModel):
     )
     options: List[str] = Field(
         ...,
-        min_items=2,
+        min_length=2,
         description="List of options to compare (minimum 2 required)",
         example=["Stripe API", "PayPal API", "Square API"]
     )
     criteria: List[str] = Field(
         ...,
-        min_items=1,
+        min_length=1,
         description="List of evaluation criteria",
         example=["Integration complexity", "Fees", "Feature set", "Documentation"]
     )
@@ -39,45 +73,48 @@ class ComparisonRequest(BaseModel):
         example="Small startup with limited development resources"
     )
 
-    @validator('question')
+    @field_validator('question')
+    @classmethod
     def question_must_not_be_empty(cls, v):
         if not v or not v.strip():
             raise ValueError('Question cannot be empty')
         return v.strip()
 
-    @validator('options')
+    @field_validator('options')
+    @classmethod
     def options_must_be_unique_and_non_empty(cls, v):
-        if len(v) < 2:
-            raise ValueError('At least 2 options are required')
-        
-        # Check for empty options
-        for option in v:
-            if not option or not option.strip():
-                raise ValueError('Options cannot be empty')
-        
-        # Check for duplicates (case-insensitive)
-        lower_options = [option.lower().strip() for option in v]
-        if len(set(lower_options)) != len(lower_options):
-            raise ValueError('Options must be unique')
-        
-        return [option.strip() for option in v]
-
-    @validator('criteria')
+        return _clean_unique_list(v, 'Options', 2, 'At least 2 options are required')
+
+    @field_validator('criteria')
+    @classmethod
     def criteria_must_be_unique_and_non_empty(cls, v):
-        if len(v) < 1:
-            raise ValueError('At least 1 criterion is required')
-        
-        # Check for empty criteria
-        for criterion in v:
-            if not criterion or not criterion.strip():
-                raise ValueError('Criteria cannot be empty')
-        
-        # Check for duplicates (case-insensitive)
-        lower_criteria = [criterion.lower().strip() for criterion in v]
-        if len(set(lower_criteria)) != len(lower_criteria):
-            raise ValueError('Criteria must be unique')
-        
-        return [criterion.strip() for criterion in v]
+        return _clean_unique_list(v, 'Criteria', 1, 'At least 1 criterion is required')
+
+
+class ComparisonRequestStruct(msgspec.Struct):
+    """
+    msgspec twin of ComparisonRequest used on the /compare hot path.
+
+    msgspec decodes straight from the request body bytes, fusing JSON
+    parsing and type validation in C; the semantic checks below mirror
+    the Pydantic validators above, which remain the documented schema.
+    """
+    question: str
+    options: List[str]
+    criteria: List[str]
+    context: Optional[str] = None
+
+    def __post_init__(self):
+        question = self.question.strip()
+        if not question:
+            raise ValueError('Question cannot be empty')
+        self.question = question
+        self.options = _clean_unique_list(
+            self.options, 'Options', 2, 'At least 2 options are required'
+        )
+        self.criteria = _clean_unique_list(
+            self.criteria, 'Criteria', 1, 'At least 1 criterion is required'
+        )
 
 
 class OptionAnalysis(BaseModel):
@@ -109,25 +146,22 @@ class OptionAnalysis(BaseModel):
         example="Stripe offers the most developer-friendly experience with excellent documentation and comprehensive features. However, the pricing can be complex and fees may be higher for smaller transaction volumes."
     )
 
-    @validator('strengths')
+    @field_validator('strengths')
+    @classmethod
     def strengths_must_not_be_empty(cls, v):
         if not v:
             raise ValueError('Strengths list cannot be empty')
-        for strength in v:
-            if not strength or not strength.strip():
-                raise ValueError('Individual strengths cannot be empty')
-        return [s.strip() for s in v]
+        return _clean_non_empty_list(v, 'strengths')
 
-    @validator('weaknesses')
+    @field_validator('weaknesses')
+    @classmethod
     def weaknesses_must_not_be_empty(cls, v):
         if not v:
             raise ValueError('Weaknesses list cannot be empty')
-        for weakness in v:
-            if not weakness or not weakness.strip():
-                raise ValueError('Individual weaknesses cannot be empty')
-        return [w.strip() for w in v]
+        return _clean_non_empty_list(v, 'weaknesses')
 
-    @validator('explanation')
+    @field_validator('explanation')
+    @classmethod
     def explanation_must_not_be_empty(cls, v):
         if not v or not v.strip():
             raise ValueError('Explanation cannot be empty')
@@ -161,13 +195,15 @@ class ComparisonResponse(BaseModel):
         example="Given your startup context and US focus, prioritize development speed over marginal fee savings."
     )
 
-    @validator('analysis')
+    @field_validator('analysis')
+    @classmethod
     def analysis_must_not_be_empty(cls, v):
         if not v:
             raise ValueError('Analysis cannot be empty')
         return v
 
-    @validator('trade_offs')
+    @field_validator('trade_offs')
+    @classmethod
     def trade_offs_must_not_be_empty(cls, v):
         if not v or not v.strip():
             raise ValueError('Trade-offs analysis cannot be empty')
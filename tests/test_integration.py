@@ -4,198 +4,194 @@ Integration tests for the Comparison Tool API.
 Tests the complete analysis pipeline with various scenarios.
 """
 
+from types import MappingProxyType
+from typing import Dict, List, Optional
+
+import msgspec
+import orjson
 import pytest
-from fastapi.testclient import TestClient
+from pydantic import ValidationError
 
+from models import ComparisonRequest
 
-@pytest.mark.integration
-def test_health_check(client):
-    """Test the health check endpoint."""
-    response = client.get("/health")
-    
-    assert response.status_code == 200
-    data = response.json()
-    assert data["status"] == "healthy"
-    assert data["service"] == "comparison-tool-api"
 
+# msgspec mirrors of the response models: decoding straight into typed
+# structs fuses parse and shape-check without the per-field dict build
+class _AnalysisStruct(msgspec.Struct):
+    strengths: List[str]
+    weaknesses: List[str]
+    explanation: str
 
-@pytest.mark.integration
-def test_root_endpoint(client):
-    """Test the root endpoint."""
-    response = client.get("/")
-    
-    assert response.status_code == 200
-    data = response.json()
-    assert "message" in data
-    assert "description" in data
-    assert data["message"] == "Comparison Tool API"
 
+class _ResponseStruct(msgspec.Struct):
+    question: str
+    analysis: Dict[str, _AnalysisStruct]
+    trade_offs: str
+    context_notes: Optional[str] = None
 
-@pytest.mark.integration
-def test_compare_endpoint_with_mock(client, mock_llm_analyzer, sample_comparison_request):
-    """Test the compare endpoint with mocked LLM analyzer."""
-    response = client.post("/compare", json=sample_comparison_request)
-    
-    assert response.status_code == 200
-    data = response.json()
-    
-    # Verify response structure
-    assert "question" in data
-    assert "analysis" in data
-    assert "trade_offs" in data
-    assert "context_notes" in data
-    
-    # Verify analysis structure
-    analysis = data["analysis"]
-    for option in sample_comparison_request["options"]:
-        if option in analysis:  # Mock might not include all options
-            option_analysis = analysis[option]
-            assert "strengths" in option_analysis
-            assert "weaknesses" in option_analysis
-            assert "explanation" in option_analysis
-            assert isinstance(option_analysis["strengths"], list)
-            assert isinstance(option_analysis["weaknesses"], list)
-            assert len(option_analysis["strengths"]) > 0
-            assert len(option_analysis["weaknesses"]) > 0
-
-
-@pytest.mark.integration
-def test_api_comparison_scenario(client, mock_llm_analyzer):
-    """Test API comparison scenario."""
-    request_data = {
-        "question": "Which payment API should I integrate?",
-        "options": ["Stripe", "PayPal", "Square"],
-        "criteria": ["Ease of integration", "Transaction fees", "Feature completeness"],
-        "context": "E-commerce startup, processing $10k/month"
-    }
-    
-    response = client.post("/compare", json=request_data)
-    
-    assert response.status_code == 200
-    data = response.json()
-    assert data["question"] == request_data["question"]
-    assert "analysis" in data
-    assert "trade_offs" in data
-
-
-@pytest.mark.integration
-def test_cloud_service_comparison_scenario(client, mock_llm_analyzer):
-    """Test cloud service comparison scenario."""
-    request_data = {
-        "question": "Which cloud provider should I choose for my web app?",
-        "options": ["AWS", "Google Cloud", "Azure"],
-        "criteria": ["Cost", "Ease of use", "Service availability", "Support quality"],
-        "context": "Small team, limited DevOps experience, budget-conscious"
-    }
-    
-    response = client.post("/compare", json=request_data)
-    
+# Every test here is an integration test, marked once for the module.
+# The xdist group keeps them on one worker sharing the session-scoped
+# client; other test files fan out across cores
+pytestmark = [
+    pytest.mark.integration,
+    pytest.mark.xdist_group("integration_api"),
+]
+
+
+def _json(response):
+    """Decode a response body straight from its bytes with orjson."""
+    return orjson.loads(response.content)
+
+
+_JSON_HEADERS = {"content-type": "application/json"}
+
+
+def _post(client, path, body):
+    """POST a body pre-serialized with orjson instead of httpx's json=."""
+    # dict() unwraps the read-only proxies below, which orjson rejects
+    return client.post(path, content=orjson.dumps(dict(body)), headers=_JSON_HEADERS)
+
+
+async def _ok(client, body):
+    """POST a comparison, assert success, and return the decoded response.
+
+    Folds the repeated POST / status-check / decode ritual of the happy-
+    path tests into one helper.
+    """
+    response = await _post(client, "/compare", body)
     assert response.status_code == 200
-    data = response.json()
-    assert data["question"] == request_data["question"]
-    assert "analysis" in data
-    assert "trade_offs" in data
-
-
-@pytest.mark.integration
-def test_tech_stack_comparison_scenario(client, mock_llm_analyzer):
-    """Test tech stack comparison scenario."""
-    request_data = {
-        "question": "Which frontend framework should I use for my project?",
-        "options": ["React", "Vue.js", "Angular", "Svelte"],
-        "criteria": ["Learning curve", "Performance", "Community support", "Job market"],
-        "context": "Solo developer, building a dashboard application, timeline is 3 months"
-    }
-    
-    response = client.post("/compare", json=request_data)
-    
+    return msgspec.json.decode(response.content, type=_ResponseStruct)
+
+# Scenario payloads are allocated once at collection time and frozen so no
+# test can mutate one and contaminate another
+_API_SCENARIO = MappingProxyType({
+    "question": "Which payment API should I integrate?",
+    "options": ["Stripe", "PayPal", "Square"],
+    "criteria": ["Ease of integration", "Transaction fees", "Feature completeness"],
+    "context": "E-commerce startup, processing $10k/month"
+})
+
+_CLOUD_SCENARIO = MappingProxyType({
+    "question": "Which cloud provider should I choose for my web app?",
+    "options": ["AWS", "Google Cloud", "Azure"],
+    "criteria": ["Cost", "Ease of use", "Service availability", "Support quality"],
+    "context": "Small team, limited DevOps experience, budget-conscious"
+})
+
+_TECH_SCENARIO = MappingProxyType({
+    "question": "Which frontend framework should I use for my project?",
+    "options": ["React", "Vue.js", "Angular", "Svelte"],
+    "criteria": ["Learning curve", "Performance", "Community support", "Job market"],
+    "context": "Solo developer, building a dashboard application, timeline is 3 months"
+})
+
+# The context/no-context pair differs only by the context key, so both
+# derive from one base dict
+_DB_BASE = MappingProxyType({
+    "question": "Which database should I use?",
+    "options": ["PostgreSQL", "MongoDB"],
+    "criteria": ["Performance", "Scalability"]
+})
+
+_DB_SCENARIO_WITH_CONTEXT = MappingProxyType({
+    **_DB_BASE,
+    "context": "High-traffic application with complex relationships"
+})
+
+_DB_SCENARIO_NO_CONTEXT = _DB_BASE
+
+
+async def test_health_check(client):
+    """Test the health check endpoint."""
+    response = await client.get("/health")
+
     assert response.status_code == 200
-    data = response.json()
-    assert data["question"] == request_data["question"]
-    assert "analysis" in data
-    assert "trade_offs" in data
-
-
-@pytest.mark.integration
-def test_context_integration(client, mock_llm_analyzer):
-    """Test that context is properly integrated into analysis."""
-    request_with_context = {
-        "question": "Which database should I use?",
-        "options": ["PostgreSQL", "MongoDB"],
-        "criteria": ["Performance", "Scalability"],
-        "context": "High-traffic application with complex relationships"
-    }
-    
-    request_without_context = {
-        "question": "Which database should I use?",
-        "options": ["PostgreSQL", "MongoDB"],
-        "criteria": ["Performance", "Scalability"]
-    }
-    
-    # Test with context
-    response_with = client.post("/compare", json=request_with_context)
-    assert response_with.status_code == 200
-    data_with = response_with.json()
-    
-    # Test without context
-    response_without = client.post("/compare", json=request_without_context)
-    assert response_without.status_code == 200
-    data_without = response_without.json()
-    
-    # Both should succeed
-    assert "analysis" in data_with
-    assert "analysis" in data_without
-    assert "trade_offs" in data_with
-    assert "trade_offs" in data_without
+    data = _json(response)
+    assert data["status"] == "healthy"
+    assert data["service"] == "comparison-tool-api"
 
 
-@pytest.mark.integration
-def test_validation_errors(client):
-    """Test various validation error scenarios."""
-    
-    # Test insufficient options
-    response = client.post("/compare", json={
-        "question": "Which is better?",
-        "options": ["Only one"],
-        "criteria": ["Cost"]
-    })
-    assert response.status_code == 422
-    
-    # Test missing required fields
-    response = client.post("/compare", json={
-        "question": "Which is better?"
-    })
-    assert response.status_code == 422
-    
-    # Test empty criteria
-    response = client.post("/compare", json={
-        "question": "Which is better?",
-        "options": ["A", "B"],
-        "criteria": []
-    })
-    assert response.status_code == 422
-    
-    # Test empty question
-    response = client.post("/compare", json={
-        "question": "",
-        "options": ["A", "B"],
-        "criteria": ["Cost"]
-    })
-    assert response.status_code == 422
+async def test_root_endpoint(client):
+    """Test the root endpoint serves the web UI."""
+    response = await client.get("/")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/html")
 
 
-@pytest.mark.integration
-def test_error_response_format(client):
+async def test_compare_endpoint_with_mock(client, mock_llm_analyzer, sample_comparison_request):
+    """Test the compare endpoint with mocked LLM analyzer."""
+    data = await _ok(client, sample_comparison_request)
+
+    # One subset check over the keys view instead of a per-option lookup;
+    # field types were already validated by the model parse above
+    assert set(sample_comparison_request["options"]) <= data.analysis.keys()
+    for option_analysis in data.analysis.values():
+        assert option_analysis.strengths and option_analysis.weaknesses
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        _API_SCENARIO,
+        _CLOUD_SCENARIO,
+        _TECH_SCENARIO,
+        _DB_SCENARIO_WITH_CONTEXT,
+        _DB_SCENARIO_NO_CONTEXT
+    ],
+    ids=["api", "cloud", "tech", "db_ctx", "db_noctx"]
+)
+async def test_comparison_scenarios(client, mock_llm_analyzer, scenario):
+    """Test comparison scenarios across domains, with and without context."""
+    data = await _ok(client, scenario)
+    assert data.question == scenario["question"]
+    assert data.analysis
+    assert data.trade_offs
+
+
+_BAD_PAYLOADS = [
+    pytest.param(
+        {"question": "Which is better?", "options": ["Only one"], "criteria": ["Cost"]},
+        id="insufficient_options"
+    ),
+    pytest.param(
+        {"question": "Which is better?"},
+        id="missing_fields"
+    ),
+    pytest.param(
+        {"question": "Which is better?", "options": ["A", "B"], "criteria": []},
+        id="empty_criteria"
+    ),
+    pytest.param(
+        {"question": "", "options": ["A", "B"], "criteria": ["Cost"]},
+        id="empty_question"
+    ),
+]
+
+
+@pytest.mark.parametrize("payload", _BAD_PAYLOADS)
+def test_request_validation(payload):
+    """Invalid payloads are rejected by the request model.
+
+    Validation rejection is pure model work, so these cases skip the HTTP
+    round-trip; test_error_response_format still covers the endpoint's
+    422 wiring.
+    """
+    with pytest.raises(ValidationError):
+        ComparisonRequest.model_validate(payload)
+
+
+async def test_error_response_format(client):
     """Test that error responses have consistent format."""
-    response = client.post("/compare", json={
+    response = await _post(client, "/compare", {
         "question": "",
         "options": ["Only one"],
         "criteria": []
     })
     
     assert response.status_code == 422
-    data = response.json()
-    
+    data = _json(response)
+
     # Check error response structure
     assert "error" in data
     assert "message" in data
@@ -203,17 +199,15 @@ def test_error_response_format(client):
     assert isinstance(data["details"], list)
 
 
-@pytest.mark.integration
-def test_llm_service_unavailable(client):
+async def test_llm_service_unavailable(client_no_llm):
     """Test behavior when LLM service is unavailable."""
-    # This test runs with the actual app where analyzer is None due to missing API key
-    response = client.post("/compare", json={
+    response = await _post(client_no_llm, "/compare", {
         "question": "Which is better?",
         "options": ["A", "B"],
         "criteria": ["Cost"]
     })
     
     assert response.status_code == 500
-    data = response.json()
+    data = _json(response)
     assert "error" in data
     assert "message" in data
\ No newline at end of file